@@ -1,4 +1,7 @@
 import logging
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from io import BytesIO
 from typing import Callable, Dict, Iterable, Optional
@@ -6,10 +9,33 @@ from typing import Callable, Dict, Iterable, Optional
 import pandas as pd
 import requests
 import urllib.parse
-from openpyxl.styles import Font
+import xlsxwriter
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 LOGGER = logging.getLogger(__name__)
-EUROPEAN_COUNTRIES = {
+
+# Shared session so concurrent product fetches reuse pooled TCP/TLS
+# connections to clinicaltrials.gov instead of handshaking per request.
+# Transient failures and rate limiting are retried with exponential
+# backoff at the adapter level, honoring any Retry-After header.
+SESSION = requests.Session()
+SESSION.mount(
+    "https://",
+    HTTPAdapter(
+        pool_connections=32,
+        pool_maxsize=32,
+        max_retries=Retry(
+            total=5,
+            backoff_factor=0.5,
+            status_forcelist=(429, 500, 502, 503, 504),
+            respect_retry_after_header=True,
+        ),
+    ),
+)
+MAX_CONCURRENT_PRODUCT_FETCHES = 8
+CONNECT_TIMEOUT_SECONDS = 5
+EUROPEAN_COUNTRIES = frozenset({
     "Austria",
     "Belgium",
     "Bulgaria",
@@ -41,8 +67,45 @@ EUROPEAN_COUNTRIES = {
     "Sweden",
     "Switzerland",
     "United Kingdom",
-}
-TARGET_COUNTRIES = {"United States", "Canada"} | EUROPEAN_COUNTRIES
+})
+TARGET_COUNTRIES = frozenset({"United States", "Canada"}) | EUROPEAN_COUNTRIES
+RESULT_COLUMNS = (
+    "Product Name",
+    "Product Name on CT.gov",
+    "original_phase",
+    "Phase on CT.gov",
+    "NCT Number",
+    "sponsor_name",
+    "Status on CT.gov",
+    "Why Stopped",
+    "Location on CT.gov",
+    "Trial Start Date",
+    "Trial End Date",
+    "Is FDA Regulated Drug",
+    "Conditions",
+)
+# Only the protocolSection paths actually consumed below are requested from
+# CT.gov, which shrinks each studies page considerably versus full records.
+CTGOV_STUDY_FIELDS = ",".join(
+    (
+        "protocolSection.identificationModule.nctId",
+        "protocolSection.statusModule.overallStatus",
+        "protocolSection.statusModule.whyStopped",
+        "protocolSection.statusModule.startDateStruct.date",
+        "protocolSection.statusModule.completionDateStruct.date",
+        "protocolSection.sponsorCollaboratorsModule.leadSponsor.name",
+        "protocolSection.designModule.phases",
+        "protocolSection.oversightModule.isFdaRegulatedDrug",
+        "protocolSection.conditionsModule.conditions",
+        "protocolSection.armsInterventionsModule.interventions.name",
+        "protocolSection.contactsLocationsModule.locations.country",
+    )
+)
+# OR-joined location filter so CT.gov excludes studies with no site in a
+# target country before they ever reach the wire; sorted for a stable URL.
+CTGOV_LOCATION_FILTER = urllib.parse.quote(
+    " OR ".join(f'"{country}"' for country in sorted(TARGET_COUNTRIES)), safe=""
+)
 
 
 def _ctgov_study_url(nct_number: str) -> str:
@@ -128,131 +191,288 @@ def get_trials(
     trial_end_cutoff_years: int = 8,
     include_unknown_end_dates: bool = True,
     reference_timestamp: Optional[pd.Timestamp] = None,
+    cancel_event: Optional[threading.Event] = None,
 ) -> list[dict]:
-    """Retrieve ClinicalTrials.gov studies for each product row."""
-    results = []
-    base_url = "https://clinicaltrials.gov/api/v2/studies"
-    page_size = 1000
-    total_rows = len(df_input.index) or 1
+    """Retrieve ClinicalTrials.gov studies for each product row.
 
-    for row_position, (index, row) in enumerate(df_input.iterrows(), start=1):
-        intervention_name = str(row["Product Name"])
-        product_id = row.get(id_column, None)
-        original_phase = row["Original Phase"]
-
-        if product_id is None:
+    When `cancel_event` is set, the fetch stops before the next HTTP
+    request and the rows collected so far are returned.
+    """
+    # Pull the three needed columns out once instead of boxing every row
+    # into a Series via iterrows.
+    product_names = df_input["Product Name"].to_numpy()
+    original_phases = df_input["Original Phase"].to_numpy()
+    id_series = df_input.get(id_column)
+    product_ids = id_series.to_numpy() if id_series is not None else [None] * len(product_names)
+
+    # Duplicate product names within a sheet would crawl the same CT.gov
+    # query repeatedly only for the NCT dedup below to discard the repeats;
+    # fetch each unique intervention once, keyed on its first-seen row.
+    tasks = []
+    seen_interventions = set()
+    for index, intervention_name, product_id, original_phase in zip(
+        df_input.index, product_names, product_ids, original_phases
+    ):
+        if product_id is None or pd.isna(product_id):
             LOGGER.warning("Skipping row %s due to missing '%s'", index, id_column)
             continue
-
-        page_token = None
-
-        while True:
-            encoded_intervention_name = urllib.parse.quote(intervention_name.strip(), safe="")
-            url = f"{base_url}?query.intr={encoded_intervention_name}&format=json&pageSize={page_size}"
-            if page_token:
-                url += f"&pageToken={page_token}"
-
-            response = requests.get(url, timeout=request_timeout_seconds)
-            if response.status_code == 200:
-                data = response.json()
-                page_token = data.get("nextPageToken")
-                studies = data.get("studies", [])
-                for study in studies:
-                    protocol_section = study["protocolSection"]
-                    study_info = protocol_section["identificationModule"]
-                    status_info = protocol_section["statusModule"]
-                    sponsor_info = protocol_section["sponsorCollaboratorsModule"]
-                    design_info = protocol_section.get("designModule", {})
-                    oversight_info = protocol_section.get("oversightModule", {})
-                    conditions_info = protocol_section.get("conditionsModule", {})
-                    locations = protocol_section.get("contactsLocationsModule", {}).get("locations", [])
-                    countries = {location["country"] for location in locations if "country" in location}
-
-                    if countries.intersection(TARGET_COUNTRIES):
-                        trial_end_date = status_info.get("completionDateStruct", {}).get(
-                            "date", "Not Available"
-                        )
-                        if not _passes_trial_end_cutoff(
-                            trial_end_date,
-                            cutoff_years=trial_end_cutoff_years,
-                            include_unknown_end_dates=include_unknown_end_dates,
-                            reference_timestamp=reference_timestamp,
-                        ):
-                            continue
-
-                        details = {
-                            id_column: product_id,
-                            "Product Name": intervention_name,
-                            "Product Name on CT.gov": ", ".join(
-                                [
-                                    intervention.get("name", "Unknown intervention")
-                                    for intervention in protocol_section.get("armsInterventionsModule", {}).get(
-                                        "interventions", []
-                                    )
-                                ]
-                            ),
-                            "original_phase": original_phase,
-                            "Phase on CT.gov": _format_ctgov_phase(design_info.get("phases")),
-                            "NCT Number": study_info["nctId"],
-                            "sponsor_name": sponsor_info["leadSponsor"]["name"],
-                            "Status on CT.gov": status_info["overallStatus"],
-                            "Why Stopped": status_info.get("whyStopped", "Not Available"),
-                            "Location on CT.gov": ", ".join(sorted(countries)),
-                            "Trial Start Date": status_info.get("startDateStruct", {}).get("date", "Not Available"),
-                            "Trial End Date": trial_end_date,
-                            "Is FDA Regulated Drug": oversight_info.get("isFdaRegulatedDrug", False),
-                            "Conditions": ", ".join(conditions_info.get("conditions", [])),
-                        }
-                        results.append(details)
-
-                if not page_token:
-                    break
-            else:
-                LOGGER.error(
-                    "Failed to retrieve data with status code %s for '%s'",
-                    response.status_code,
+        normalized_name = str(intervention_name).strip()
+        if normalized_name in seen_interventions:
+            LOGGER.info("Skipping duplicate product name '%s' at row %s", normalized_name, index)
+            continue
+        seen_interventions.add(normalized_name)
+        tasks.append((normalized_name, product_id, original_phase))
+
+    if not tasks:
+        return []
+
+    total_tasks = len(tasks)
+    completed_tasks = 0
+    futures = []
+    with ThreadPoolExecutor(max_workers=min(MAX_CONCURRENT_PRODUCT_FETCHES, total_tasks)) as executor:
+        for intervention_name, product_id, original_phase in tasks:
+            futures.append(
+                executor.submit(
+                    _fetch_product_trials,
                     intervention_name,
+                    product_id,
+                    original_phase,
+                    id_column,
+                    request_timeout_seconds=request_timeout_seconds,
+                    trial_end_cutoff_years=trial_end_cutoff_years,
+                    include_unknown_end_dates=include_unknown_end_dates,
+                    reference_timestamp=reference_timestamp,
+                    cancel_event=cancel_event,
                 )
-                break
+            )
+
+        for future in as_completed(futures):
+            completed_tasks += 1
+            if progress_callback:
+                percent_complete = int((completed_tasks / total_tasks) * 100)
+                progress_callback(
+                    percent_complete, f"Processed {completed_tasks}/{total_tasks} products"
+                )
+
+    # Flatten in submission order so output rows stay aligned with the input,
+    # dropping repeat NCT numbers here instead of carrying them through the
+    # DataFrame and into the writer's dedup pass.
+    results = []
+    seen_nct_numbers = set()
+    for future in futures:
+        for details in future.result():
+            nct_number = details.get("NCT Number")
+            if nct_number and nct_number in seen_nct_numbers:
+                continue
+            seen_nct_numbers.add(nct_number)
+            results.append(details)
+    return results
 
-        if progress_callback:
-            percent_complete = int((row_position / total_rows) * 100)
-            progress_callback(percent_complete, f"Processed {row_position}/{total_rows} products")
+
+def _fetch_product_trials(
+    intervention_name: str,
+    product_id: object,
+    original_phase: object,
+    id_column: str,
+    request_timeout_seconds: int = 30,
+    trial_end_cutoff_years: int = 8,
+    include_unknown_end_dates: bool = True,
+    reference_timestamp: Optional[pd.Timestamp] = None,
+    cancel_event: Optional[threading.Event] = None,
+) -> list[dict]:
+    """Fetch and filter all paginated CT.gov studies for one product."""
+    results: list[dict] = []
+    base_url = "https://clinicaltrials.gov/api/v2/studies"
+    page_size = 1000
+    page_token = None
+
+    # Everything but the page token is constant across pagination, so the
+    # quoting and base query string are built once outside the loop.
+    encoded_intervention_name = urllib.parse.quote(intervention_name.strip(), safe="")
+    query_url = (
+        f"{base_url}?query.intr={encoded_intervention_name}&format=json"
+        f"&pageSize={page_size}&fields={CTGOV_STUDY_FIELDS}"
+        f"&query.locn={CTGOV_LOCATION_FILTER}"
+    )
+
+    while True:
+        if cancel_event is not None and cancel_event.is_set():
+            LOGGER.info(
+                "Cancellation requested; returning %s partial results for '%s'",
+                len(results),
+                intervention_name,
+            )
+            break
+
+        url = query_url
+        if page_token:
+            url += f"&pageToken={page_token}"
+
+        response = SESSION.get(url, timeout=(CONNECT_TIMEOUT_SECONDS, request_timeout_seconds))
+        if response.status_code == 200:
+            data = response.json()
+            page_token = data.get("nextPageToken")
+            studies = data.get("studies", [])
+            for study in studies:
+                protocol_section = study["protocolSection"]
+                study_info = protocol_section["identificationModule"]
+                status_info = protocol_section["statusModule"]
+                sponsor_info = protocol_section["sponsorCollaboratorsModule"]
+                design_info = protocol_section.get("designModule", {})
+                oversight_info = protocol_section.get("oversightModule", {})
+                conditions_info = protocol_section.get("conditionsModule", {})
+                locations = protocol_section.get("contactsLocationsModule", {}).get("locations", [])
+                countries = {location["country"] for location in locations if "country" in location}
+
+                if not TARGET_COUNTRIES.isdisjoint(countries):
+                    trial_end_date = status_info.get("completionDateStruct", {}).get(
+                        "date", "Not Available"
+                    )
+                    if not _passes_trial_end_cutoff(
+                        trial_end_date,
+                        cutoff_years=trial_end_cutoff_years,
+                        include_unknown_end_dates=include_unknown_end_dates,
+                        reference_timestamp=reference_timestamp,
+                    ):
+                        continue
+
+                    details = {
+                        id_column: product_id,
+                        "Product Name": intervention_name,
+                        "Product Name on CT.gov": ", ".join(
+                            [
+                                intervention.get("name", "Unknown intervention")
+                                for intervention in protocol_section.get("armsInterventionsModule", {}).get(
+                                    "interventions", []
+                                )
+                            ]
+                        ),
+                        "original_phase": original_phase,
+                        "Phase on CT.gov": _format_ctgov_phase(design_info.get("phases")),
+                        "NCT Number": study_info["nctId"],
+                        "sponsor_name": sponsor_info["leadSponsor"]["name"],
+                        "Status on CT.gov": status_info["overallStatus"],
+                        "Why Stopped": status_info.get("whyStopped", "Not Available"),
+                        "Location on CT.gov": ", ".join(sorted(countries)),
+                        "Trial Start Date": status_info.get("startDateStruct", {}).get("date", "Not Available"),
+                        "Trial End Date": trial_end_date,
+                        "Is FDA Regulated Drug": oversight_info.get("isFdaRegulatedDrug", False),
+                        "Conditions": ", ".join(conditions_info.get("conditions", [])),
+                    }
+                    results.append(details)
+
+            if not page_token:
+                break
+        else:
+            LOGGER.error(
+                "Failed to retrieve data with status code %s for '%s'",
+                response.status_code,
+                intervention_name,
+            )
+            break
 
     return results
 
 
-def create_results_workbook_bytes(
+def results_to_frame(results: list[dict], id_column: str) -> pd.DataFrame:
+    """Build a result DataFrame column-wise from `get_trials` row dicts.
+
+    The result schema is fixed, so filling one list per column avoids the
+    key-union scan pandas performs when constructing from a list of dicts.
+    An empty result still yields the full header so downstream sheet
+    writing works for products without matching trials.
+    """
+    columns = (id_column, *RESULT_COLUMNS)
+    return pd.DataFrame(
+        {column: [row.get(column) for row in results] for column in columns},
+        copy=False,
+    )
+
+
+def create_results_workbook_buffer(
     results_dict: Dict[str, pd.DataFrame],
     input_sheet_names: Iterable[str],
-) -> bytes:
-    """Serialize results into an Excel workbook stored in memory."""
+) -> BytesIO:
+    """Serialize results into an in-memory Excel workbook buffer.
+
+    Rows are streamed straight into xlsxwriter in constant-memory mode,
+    bypassing the pandas ``to_excel`` formatter so large result sets do not
+    materialize a second in-memory copy of the workbook.
+    """
     buffer = BytesIO()
-    with pd.ExcelWriter(buffer, engine="openpyxl") as writer:
+    # strings_to_urls would regex-scan every written string for URL shapes;
+    # the only hyperlinks we want are the explicit write_url calls below.
+    workbook = xlsxwriter.Workbook(buffer, {"constant_memory": True, "strings_to_urls": False})
+    # Keep explicit visual style even if workbook theme differs.
+    hyperlink_format = workbook.add_format({"font_color": "#0563C1", "underline": 1})
+    try:
         for sheet_name in input_sheet_names:
             dataframe = results_dict.get(sheet_name)
             if dataframe is None:
                 continue
 
             deduplicated = dataframe.drop_duplicates(subset=["NCT Number"])
-            deduplicated.to_excel(writer, sheet_name=sheet_name[:31], index=False)
-
-            worksheet = writer.sheets[sheet_name[:31]]
-            if "NCT Number" in deduplicated.columns:
-                nct_column_index = deduplicated.columns.get_loc("NCT Number") + 1
-                header_offset = 1  # row 1 is header in to_excel output
-                for row_index, nct_value in enumerate(deduplicated["NCT Number"], start=1):
-                    if pd.isna(nct_value):
-                        continue
-                    nct_text = str(nct_value).strip()
-                    if not nct_text:
-                        continue
-                    cell = worksheet.cell(row=row_index + header_offset, column=nct_column_index)
-                    cell.hyperlink = _ctgov_study_url(nct_text)
-                    cell.style = "Hyperlink"
-                    # Keep explicit visual style even if workbook theme differs.
-                    cell.font = Font(color="0563C1", underline="single")
+            # xlsxwriter rejects NaN; emit blank cells like to_excel did.
+            deduplicated = deduplicated.astype(object).where(pd.notna(deduplicated), None)
+
+            worksheet = workbook.add_worksheet(sheet_name[:31])
+            worksheet.write_row(0, 0, list(deduplicated.columns))
+
+            nct_column_index = (
+                deduplicated.columns.get_loc("NCT Number")
+                if "NCT Number" in deduplicated.columns
+                else None
+            )
+            for row_index, row in enumerate(deduplicated.itertuples(index=False, name=None), start=1):
+                worksheet.write_row(row_index, 0, row)
+                if nct_column_index is None:
+                    continue
+                nct_value = row[nct_column_index]
+                if nct_value is None:
+                    continue
+                nct_text = str(nct_value).strip()
+                if not nct_text:
+                    continue
+                worksheet.write_url(
+                    row_index,
+                    nct_column_index,
+                    _ctgov_study_url(nct_text),
+                    hyperlink_format,
+                    nct_text,
+                )
+    finally:
+        workbook.close()
+
+    buffer.seek(0)
+    return buffer
+
+
+def create_results_workbook_bytes(
+    results_dict: Dict[str, pd.DataFrame],
+    input_sheet_names: Iterable[str],
+) -> bytes:
+    """Serialize results into an Excel workbook returned as raw bytes."""
+    return create_results_workbook_buffer(results_dict, input_sheet_names).getvalue()
+
+
+def create_results_csv_zip_bytes(
+    results_dict: Dict[str, pd.DataFrame],
+    input_sheet_names: Iterable[str],
+) -> bytes:
+    """Serialize results into a zip archive of per-sheet CSV files.
 
+    pandas' C CSV writer is orders of magnitude faster than xlsx
+    serialization, so this is offered as an alternative download when the
+    result set is very large.
+    """
+    buffer = BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for sheet_name in input_sheet_names:
+            dataframe = results_dict.get(sheet_name)
+            if dataframe is None:
+                continue
+            deduplicated = dataframe.drop_duplicates(subset=["NCT Number"])
+            archive.writestr(f"{sheet_name[:31]}.csv", deduplicated.to_csv(index=False))
     return buffer.getvalue()
 
 
@@ -1,11 +1,67 @@
+import functools
 import io
 import logging
+import re
 from typing import Any, Dict, Iterable, Mapping, Optional, Tuple
 
 import pandas as pd
+from openpyxl import load_workbook
+
+try:
+    import python_calamine  # noqa: F401
+    _HAS_CALAMINE = True
+except ImportError:
+    _HAS_CALAMINE = False
 
 LOGGER = logging.getLogger(__name__)
 ID_COLUMN_CANDIDATES = ("bioTRAK Product ID", "TC Scrape Number")
+_ID_COLUMN_RE = re.compile("|".join(re.escape(candidate) for candidate in ID_COLUMN_CANDIDATES))
+
+
+def _trim_trailing_empty_rows(dataframe: pd.DataFrame) -> pd.DataFrame:
+    """Drop phantom all-empty rows from the end of a parsed sheet.
+
+    Both read paths trust the sheet's declared dimensions, which some
+    writers overstate; the surplus rows come through entirely empty and
+    would otherwise inflate row counts and per-row skip warnings.
+    """
+    row_has_value = dataframe.notna().any(axis=1).to_numpy()
+    keep = len(row_has_value)
+    while keep and not row_has_value[keep - 1]:
+        keep -= 1
+    if keep == len(dataframe):
+        return dataframe
+    return dataframe.iloc[:keep]
+
+
+def _normalize_header_labels(header: Iterable[Any]) -> list:
+    """Mirror pandas' read_excel header handling for a raw header row.
+
+    Blank cells become positional "Unnamed: N" labels and repeated names get
+    ".1"-style suffixes, so downstream string matching and column selection
+    behave the same as on the pd.read_excel paths.
+    """
+    labels = []
+    seen_counts: Dict[Any, int] = {}
+    for position, value in enumerate(header):
+        if value is None or (isinstance(value, float) and pd.isna(value)):
+            value = f"Unnamed: {position}"
+        occurrence = seen_counts.get(value, 0)
+        seen_counts[value] = occurrence + 1
+        labels.append(f"{value}.{occurrence}" if occurrence else value)
+    return labels
+
+
+def _worksheet_to_dataframe(worksheet) -> pd.DataFrame:
+    """Build a DataFrame from a streamed worksheet, promoting row 1 to header."""
+    rows = worksheet.iter_rows(values_only=True)
+    header = next(rows, None)
+    if header is None:
+        return pd.DataFrame()
+
+    return _trim_trailing_empty_rows(
+        pd.DataFrame(list(rows), columns=_normalize_header_labels(header))
+    )
 
 
 def load_excel_file(file_source: Any) -> Dict[str, pd.DataFrame]:
@@ -13,16 +69,36 @@ def load_excel_file(file_source: Any) -> Dict[str, pd.DataFrame]:
     Load an Excel workbook into a dictionary of DataFrames.
 
     Accepts either a filesystem path, uploaded bytes, or a file-like object.
+    When python-calamine is installed the workbook is parsed by its Rust
+    reader, which is both faster and lighter than openpyxl; otherwise the
+    workbook is opened in openpyxl read_only mode so cells stream through
+    instead of being materialized as a full document tree.
     """
     try:
         if isinstance(file_source, (bytes, bytearray)):
-            workbook = io.BytesIO(file_source)
+            workbook_source = io.BytesIO(file_source)
             source_label = "uploaded bytes"
         else:
-            workbook = file_source
+            workbook_source = file_source
             source_label = str(file_source)
 
-        sheets = pd.read_excel(workbook, sheet_name=None)
+        if _HAS_CALAMINE:
+            sheets = {
+                sheet_name: _trim_trailing_empty_rows(dataframe)
+                for sheet_name, dataframe in pd.read_excel(
+                    workbook_source, sheet_name=None, engine="calamine"
+                ).items()
+            }
+        else:
+            workbook = load_workbook(workbook_source, read_only=True, data_only=True)
+            try:
+                sheets = {
+                    sheet_name: _worksheet_to_dataframe(workbook[sheet_name])
+                    for sheet_name in workbook.sheetnames
+                }
+            finally:
+                workbook.close()
+
         LOGGER.info("Loaded workbook '%s' with sheets: %s", source_label, list(sheets.keys()))
         return sheets
     except Exception as exc:
@@ -32,23 +108,24 @@ def load_excel_file(file_source: Any) -> Dict[str, pd.DataFrame]:
 
 def validate_excel_content(
     sheets: Mapping[str, pd.DataFrame],
-    required_columns_mapping: Mapping[str, Iterable[str]],
+    required_columns: Iterable[str],
 ) -> Dict[str, Tuple[bool, str]]:
     """
     Validate workbook sheets with flexible substring matching on required columns.
+
+    The same required columns apply to every sheet, so they are normalized
+    once here instead of being rebuilt per sheet by callers.
     """
+    required_non_id_columns = tuple(
+        column for column in required_columns if column not in ID_COLUMN_CANDIDATES
+    )
     validation_results: Dict[str, Tuple[bool, str]] = {}
 
     for sheet_name, dataframe in sheets.items():
-        required_columns = list(required_columns_mapping.get(sheet_name, []))
-        dataframe_columns = dataframe.columns.tolist()
-
-        matching_id_columns = [
-            column
-            for column in dataframe_columns
-            if any(required_id in column for required_id in ID_COLUMN_CANDIDATES)
-        ]
-        if not matching_id_columns:
+        has_id_column, missing_columns = _check_sheet_columns(
+            tuple(dataframe.columns), required_non_id_columns
+        )
+        if not has_id_column:
             validation_results[sheet_name] = (
                 False,
                 (
@@ -56,35 +133,46 @@ def validate_excel_content(
                     f"columns: {', '.join(ID_COLUMN_CANDIDATES)}"
                 ),
             )
-            continue
-
-        required_non_id_columns = [
-            column for column in required_columns if column not in ID_COLUMN_CANDIDATES
-        ]
-        missing_columns = [
-            required_column
-            for required_column in required_non_id_columns
-            if not any(required_column in actual_column for actual_column in dataframe_columns)
-        ]
-        if missing_columns:
+        elif missing_columns:
             validation_results[sheet_name] = (
                 False,
                 f"Missing required columns: {', '.join(missing_columns)}",
             )
-            continue
-
-        validation_results[sheet_name] = (True, "File content is valid")
+        else:
+            validation_results[sheet_name] = (True, "File content is valid")
 
     return validation_results
 
 
+@functools.lru_cache(maxsize=256)
+def _check_sheet_columns(
+    columns: Tuple[str, ...],
+    required_columns: Tuple[str, ...],
+) -> Tuple[bool, Tuple[str, ...]]:
+    """Check one header signature, memoized so unchanged sheets skip the scan.
+
+    Returns whether an ID column is present and which required columns have
+    no substring match.
+    """
+    has_id_column = any(_ID_COLUMN_RE.search(column) for column in columns)
+    missing_columns = tuple(
+        required_column
+        for required_column in required_columns
+        if not any(required_column in actual_column for actual_column in columns)
+    )
+    return has_id_column, missing_columns
+
+
+@functools.lru_cache(maxsize=256)
+def _find_id_column_cached(columns: Tuple[str, ...]) -> Optional[str]:
+    return next((column for column in columns if _ID_COLUMN_RE.search(column)), None)
+
+
 def find_id_column(columns: Iterable[str]) -> Optional[str]:
     """
     Return the first matching ID column candidate from a list of columns.
+
+    Lookups are memoized by the column tuple because Streamlit reruns
+    revisit the same sheet headers repeatedly.
     """
-    for column in columns:
-        if "TC Scrape Number" in column:
-            return column
-        if "bioTRAK Product ID" in column:
-            return column
-    return None
\ No newline at end of file
+    return _find_id_column_cached(tuple(columns))
\ No newline at end of file
@@ -1,19 +1,17 @@
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
 from typing import Callable, Dict, List, Optional, Tuple
 
 import pandas as pd
 
-from logic.data_processing import get_trials
+from logic.data_processing import get_trials, results_to_frame
 from logic.file_operations import find_id_column, load_excel_file, validate_excel_content
 
 LOGGER = logging.getLogger(__name__)
 REQUIRED_COLUMNS = ["Product Name", "Original Phase"]
 
 
-def _build_required_columns_mapping(sheets: Dict[str, pd.DataFrame]) -> Dict[str, List[str]]:
-    return {sheet_name: REQUIRED_COLUMNS for sheet_name in sheets.keys()}
-
-
 def get_workbook_validation_report(file_bytes: bytes) -> Dict[str, object]:
     """
     Build a pre-run validation report suitable for UI rendering.
@@ -22,7 +20,7 @@ def get_workbook_validation_report(file_bytes: bytes) -> Dict[str, object]:
     if not sheets:
         raise ValueError("The uploaded workbook does not contain any sheets.")
 
-    validation_results = validate_excel_content(sheets, _build_required_columns_mapping(sheets))
+    validation_results = validate_excel_content(sheets, REQUIRED_COLUMNS)
     report_rows: List[Dict[str, object]] = []
 
     for sheet_name, dataframe in sheets.items():
@@ -56,73 +54,120 @@ def process_workbook(
     progress_callback: Optional[Callable[[float, str], None]] = None,
     trial_end_cutoff_years: int = 8,
     include_unknown_end_dates: bool = True,
+    cancel_event: Optional[threading.Event] = None,
 ) -> Tuple[Dict[str, pd.DataFrame], List[str], Dict[str, int]]:
     """
     Validate and process an uploaded workbook into sheet-level trial results.
+
+    A set `cancel_event` makes in-flight sheet fetches stop at their next
+    request boundary and return whatever rows they had collected.
     """
     sheets = load_excel_file(file_bytes)
     if not sheets:
         raise ValueError("The uploaded workbook does not contain any sheets.")
 
-    required_columns_mapping = _build_required_columns_mapping(sheets)
-    validation_results = validate_excel_content(sheets, required_columns_mapping)
-
-    valid_sheets: Dict[str, pd.DataFrame] = {
-        sheet_name: sheets[sheet_name]
-        for sheet_name, (is_valid, _) in validation_results.items()
-        if is_valid
-    }
-    non_empty_sheets = {
-        sheet_name: dataframe for sheet_name, dataframe in valid_sheets.items() if not dataframe.empty
-    }
-    if not non_empty_sheets:
-        raise ValueError("No valid non-empty sheets were found in the uploaded file.")
+    validation_results = validate_excel_content(sheets, REQUIRED_COLUMNS)
 
+    # One pass over the validation results builds the summary, the sheet
+    # counts, and the job list, instead of materializing intermediate
+    # valid/non-empty dicts between separate loops.
     summary_messages: List[str] = []
+    sheet_jobs: Dict[str, Tuple[pd.DataFrame, str]] = {}
+    skipped_missing_id = 0
+    valid_sheet_count = 0
+    non_empty_valid_count = 0
     for sheet_name, (is_valid, message) in validation_results.items():
         prefix = "Validated" if is_valid else "Skipped"
         summary_messages.append(f"{prefix} '{sheet_name}': {message}")
-
-    total_sheets = len(non_empty_sheets)
-    results_dict: Dict[str, pd.DataFrame] = {}
-    processed_sheets = 0
-    skipped_missing_id = 0
-
-    for sheet_position, (sheet_name, dataframe) in enumerate(non_empty_sheets.items(), start=1):
+        if not is_valid:
+            continue
+        valid_sheet_count += 1
+        dataframe = sheets[sheet_name]
+        if dataframe.empty:
+            continue
+        non_empty_valid_count += 1
         id_column = find_id_column(dataframe.columns)
         if not id_column:
             LOGGER.warning("Skipping '%s' due to missing ID column", sheet_name)
             summary_messages.append(f"Skipped '{sheet_name}': missing ID column")
             skipped_missing_id += 1
             continue
-
-        def _on_row_progress(percent_complete: int, message: str) -> None:
-            if not progress_callback:
-                return
-            overall_progress = ((sheet_position - 1) + (percent_complete / 100.0)) / total_sheets
-            progress_callback(min(max(overall_progress, 0.0), 1.0), f"{sheet_name}: {message}")
-
         LOGGER.info("Processing sheet '%s' with ID column '%s'", sheet_name, id_column)
-        results = get_trials(
-            dataframe,
-            id_column,
-            progress_callback=_on_row_progress,
-            trial_end_cutoff_years=trial_end_cutoff_years,
-            include_unknown_end_dates=include_unknown_end_dates,
-        )
-        results_dict[sheet_name] = pd.DataFrame(results)
-        processed_sheets += 1
+        sheet_jobs[sheet_name] = (dataframe, id_column)
 
-        if progress_callback:
-            progress_callback(sheet_position / total_sheets, f"{sheet_name}: completed")
+    if not non_empty_valid_count:
+        raise ValueError("No valid non-empty sheets were found in the uploaded file.")
+
+    # get_trials is network-bound, so independent sheets run concurrently.
+    # Workers record their per-product percentages under a lock and this
+    # thread polls and reports the row-weighted total, so progress moves
+    # within a sheet and Streamlit widgets are never touched from workers.
+    unordered_results: Dict[str, pd.DataFrame] = {}
+    total_jobs = len(sheet_jobs)
+    if sheet_jobs:
+        progress_lock = threading.Lock()
+        sheet_percents = {sheet_name: 0 for sheet_name in sheet_jobs}
+        sheet_weights = {
+            sheet_name: max(len(dataframe.index), 1)
+            for sheet_name, (dataframe, _) in sheet_jobs.items()
+        }
+        total_weight = sum(sheet_weights.values())
+
+        def _record_sheet_percent(sheet_name: str) -> Callable[[int, str], None]:
+            def _record(percent: int, _message: str) -> None:
+                with progress_lock:
+                    sheet_percents[sheet_name] = percent
+
+            return _record
+
+        def _report_overall_progress() -> None:
+            with progress_lock:
+                weighted_percent = sum(
+                    sheet_percents[sheet_name] * sheet_weights[sheet_name]
+                    for sheet_name in sheet_percents
+                )
+            fraction = weighted_percent / (100 * total_weight)
+            progress_callback(fraction, f"Fetching trials: {int(fraction * 100)}% of products")
+
+        with ThreadPoolExecutor(max_workers=min(8, total_jobs)) as executor:
+            futures = {
+                executor.submit(
+                    get_trials,
+                    dataframe,
+                    id_column,
+                    progress_callback=_record_sheet_percent(sheet_name),
+                    trial_end_cutoff_years=trial_end_cutoff_years,
+                    include_unknown_end_dates=include_unknown_end_dates,
+                    cancel_event=cancel_event,
+                ): sheet_name
+                for sheet_name, (dataframe, id_column) in sheet_jobs.items()
+            }
+            pending = set(futures)
+            while pending:
+                done, pending = wait(pending, timeout=0.5)
+                for future in done:
+                    sheet_name = futures[future]
+                    with progress_lock:
+                        sheet_percents[sheet_name] = 100
+                    unordered_results[sheet_name] = results_to_frame(
+                        future.result(), sheet_jobs[sheet_name][1]
+                    )
+                if progress_callback:
+                    _report_overall_progress()
+
+    # Preserve the workbook's sheet order in the output.
+    results_dict: Dict[str, pd.DataFrame] = {
+        sheet_name: unordered_results[sheet_name] for sheet_name in sheet_jobs
+    }
+    processed_sheets = len(results_dict)
 
     if not results_dict:
         raise ValueError("No sheets produced results. Please verify workbook structure.")
 
     metrics = {
         "total_sheets": len(sheets),
-        "valid_sheets": len(valid_sheets),
-        "non_empty_valid_sheets": len(non_empty_sheets),
+        "valid_sheets": valid_sheet_count,
+        "non_empty_valid_sheets": non_empty_valid_count,
         "processed_sheets": processed_sheets,
         "skipped_missing_id": skipped_missing_id,
         "output_rows": int(sum(len(df.index) for df in results_dict.values())),
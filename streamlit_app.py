@@ -1,25 +1,73 @@
+import atexit
+import hmac
 import logging
 import os
+import time
 from datetime import datetime
-from typing import Dict, List, Tuple
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from queue import Queue
+from io import BytesIO
+from typing import Dict, List, Optional, Tuple
 
 import pandas as pd
 import streamlit as st
 
-from logic.data_processing import create_results_workbook_bytes
+from logic.data_processing import create_results_csv_zip_bytes, create_results_workbook_buffer
 from logic.workflow import get_workbook_validation_report, process_workbook
 
 LOGGER = logging.getLogger(__name__)
 APP_VERSION = os.getenv("APP_VERSION", "v1.1.0")
 DEFAULT_APP_USERNAME = os.getenv("APP_USERNAME", "admin")
 DEFAULT_APP_PASSWORD = os.getenv("APP_PASSWORD", "admin123")
+# Above this many output cells, xlsx serialization gets slow enough that a
+# CSV bundle is offered as a faster alternative download.
+CSV_EXPORT_CELL_THRESHOLD = 5_000_000
+PROGRESS_UPDATE_MIN_INTERVAL_SECONDS = 0.2
+# Factories, not values, so mutable defaults are never shared across sessions.
+_RESULT_STATE_DEFAULTS = {
+    "result_buffer": lambda: None,
+    "result_csv_bytes": lambda: None,
+    "result_filename": lambda: None,
+    "summary_messages": list,
+    "run_metrics": lambda: None,
+}
+
+def _setup_logging() -> None:
+    """Install queue-based logging so hot paths never block on disk writes.
+
+    Log records are pushed onto an in-memory queue and drained to the file
+    and console handlers by a background listener thread.
+    """
+    root_logger = logging.getLogger()
+    if root_logger.handlers:
+        return
+
+    formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
+    file_handler = RotatingFileHandler("app.log", maxBytes=10_000_000, backupCount=3)
+    stream_handler = logging.StreamHandler()
+    for handler in (file_handler, stream_handler):
+        handler.setFormatter(formatter)
+
+    log_queue: "Queue[logging.LogRecord]" = Queue(-1)
+    listener = QueueListener(log_queue, file_handler, stream_handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+
+    root_logger.setLevel(logging.INFO)
+    root_logger.addHandler(QueueHandler(log_queue))
 
-if not logging.getLogger().handlers:
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(asctime)s - %(levelname)s - %(message)s",
-        handlers=[logging.FileHandler("app.log"), logging.StreamHandler()],
-    )
+
+_setup_logging()
+
+
+@st.cache_data(show_spinner=False)
+def _cached_validation_report(file_bytes: bytes) -> Dict[str, object]:
+    """Parse and validate the upload once per unique file within a session.
+
+    Streamlit reruns the whole script on every widget interaction; caching on
+    the upload bytes makes those reruns skip the workbook re-parse.
+    """
+    return get_workbook_validation_report(file_bytes)
 
 
 def _get_secret_or_default(secret_key: str, default_value: str) -> str:
@@ -47,7 +95,10 @@ def _show_login_page() -> None:
         if st.button("Login", type="primary", use_container_width=True):
             valid_username = _get_secret_or_default("auth_username", DEFAULT_APP_USERNAME)
             valid_password = _get_secret_or_default("auth_password", DEFAULT_APP_PASSWORD)
-            if username == valid_username and password == valid_password:
+            # Constant-time comparison; == would leak match length/prefix timing.
+            username_ok = hmac.compare_digest(username.encode(), valid_username.encode())
+            password_ok = hmac.compare_digest(password.encode(), valid_password.encode())
+            if username_ok and password_ok:
                 st.session_state.authenticated = True
                 st.session_state.username = username
                 st.rerun()
@@ -60,8 +111,24 @@ def _process_uploaded_file(
     progress_bar: "st.delta_generator.DeltaGenerator",
     trial_end_cutoff_years: int,
     include_unknown_end_dates: bool,
-) -> Tuple[bytes, str, List[str], Dict[str, int]]:
+) -> Tuple[BytesIO, Optional[bytes], str, List[str], Dict[str, int]]:
+    last_rendered_percent = -1
+    last_rendered_at = 0.0
+
     def _on_progress(progress_value: float, message: str) -> None:
+        # Each progress call is a round-trip to the browser; only redraw when
+        # the visible percentage changes and enough time has passed since the
+        # previous redraw. The final update always goes through.
+        nonlocal last_rendered_percent, last_rendered_at
+        percent = int(progress_value * 100)
+        now = time.monotonic()
+        if progress_value < 1.0 and (
+            percent == last_rendered_percent
+            or now - last_rendered_at < PROGRESS_UPDATE_MIN_INTERVAL_SECONDS
+        ):
+            return
+        last_rendered_percent = percent
+        last_rendered_at = now
         progress_bar.progress(progress_value, text=message)
 
     results_dict, summary_messages, metrics = process_workbook(
@@ -70,9 +137,18 @@ def _process_uploaded_file(
         trial_end_cutoff_years=trial_end_cutoff_years,
         include_unknown_end_dates=include_unknown_end_dates,
     )
-    workbook_bytes = create_results_workbook_bytes(results_dict, results_dict.keys())
+    # Pass a detached name list rather than a live keys view so the writers
+    # hold no reference that pins results_dict beyond their own use of it.
+    sheet_names = list(results_dict)
+    workbook_buffer = create_results_workbook_buffer(results_dict, sheet_names)
+    total_cells = sum(int(dataframe.size) for dataframe in results_dict.values())
+    csv_zip_bytes = (
+        create_results_csv_zip_bytes(results_dict, sheet_names)
+        if total_cells >= CSV_EXPORT_CELL_THRESHOLD
+        else None
+    )
     output_filename = f"biotrak_scrape_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-    return workbook_bytes, output_filename, summary_messages, metrics
+    return workbook_buffer, csv_zip_bytes, output_filename, summary_messages, metrics
 
 
 def main() -> None:
@@ -87,14 +163,9 @@ def main() -> None:
     st.caption("Upload an Excel file, query ClinicalTrials.gov, and download a cleaned output workbook.")
     st.caption(f"App version: {APP_VERSION}")
 
-    if "result_bytes" not in st.session_state:
-        st.session_state.result_bytes = None
-    if "result_filename" not in st.session_state:
-        st.session_state.result_filename = None
-    if "summary_messages" not in st.session_state:
-        st.session_state.summary_messages = []
-    if "run_metrics" not in st.session_state:
-        st.session_state.run_metrics = None
+    # One set difference instead of a membership check per key on each rerun.
+    for state_key in _RESULT_STATE_DEFAULTS.keys() - st.session_state.keys():
+        st.session_state[state_key] = _RESULT_STATE_DEFAULTS[state_key]()
 
     with st.sidebar:
         st.caption(f"Logged in as: {st.session_state.username}")
@@ -124,7 +195,7 @@ def main() -> None:
 
     if uploaded_file_bytes:
         try:
-            validation_report = get_workbook_validation_report(uploaded_file_bytes)
+            validation_report = _cached_validation_report(uploaded_file_bytes)
             with st.expander("Pre-run validation", expanded=True):
                 metric_col_1, metric_col_2, metric_col_3 = st.columns(3)
                 metric_col_1.metric("Total sheets", validation_report["total_sheets"])
@@ -145,7 +216,8 @@ def main() -> None:
         )
     with reset_col:
         if st.button("Clear current output"):
-            st.session_state.result_bytes = None
+            st.session_state.result_buffer = None
+            st.session_state.result_csv_bytes = None
             st.session_state.result_filename = None
             st.session_state.summary_messages = []
             st.session_state.run_metrics = None
@@ -157,13 +229,14 @@ def main() -> None:
         else:
             progress_bar = st.progress(0.0, text="Preparing workbook...")
             try:
-                result_bytes, result_filename, summary_messages, run_metrics = _process_uploaded_file(
+                result_buffer, result_csv_bytes, result_filename, summary_messages, run_metrics = _process_uploaded_file(
                     uploaded_file_bytes,
                     progress_bar,
                     trial_end_cutoff_years=trial_end_cutoff_years,
                     include_unknown_end_dates=include_unknown_end_dates,
                 )
-                st.session_state.result_bytes = result_bytes
+                st.session_state.result_buffer = result_buffer
+                st.session_state.result_csv_bytes = result_csv_bytes
                 st.session_state.result_filename = result_filename
                 st.session_state.summary_messages = summary_messages
                 st.session_state.run_metrics = run_metrics
@@ -191,13 +264,20 @@ def main() -> None:
             for message in st.session_state.summary_messages:
                 st.write(f"- {message}")
 
-    if st.session_state.result_bytes and st.session_state.result_filename:
+    if st.session_state.result_buffer and st.session_state.result_filename:
         st.download_button(
             label="Download processed workbook",
-            data=st.session_state.result_bytes,
+            data=st.session_state.result_buffer,
             file_name=st.session_state.result_filename,
             mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
         )
+        if st.session_state.result_csv_bytes:
+            st.download_button(
+                label="Download as CSV bundle (faster for large outputs)",
+                data=st.session_state.result_csv_bytes,
+                file_name=st.session_state.result_filename.replace(".xlsx", ".zip"),
+                mime="application/zip",
+            )
 
 
 if __name__ == "__main__":
@@ -1,3 +1,5 @@
+import threading
+import zipfile
 from io import BytesIO
 
 import pandas as pd
@@ -5,6 +7,7 @@ from openpyxl import load_workbook
 
 from logic.data_processing import (
     _format_ctgov_phase,
+    create_results_csv_zip_bytes,
     create_results_workbook_bytes,
     get_trials,
 )
@@ -25,6 +28,23 @@ def test_create_results_workbook_bytes_deduplicates_nct_numbers():
     assert loaded["SheetA"].iloc[0]["NCT Number"] == "NCT001"
 
 
+def test_create_results_csv_zip_bytes_writes_one_csv_per_sheet():
+    dataframe = pd.DataFrame(
+        [
+            {"NCT Number": "NCT001", "Product Name": "Drug A"},
+            {"NCT Number": "NCT001", "Product Name": "Drug A"},
+        ]
+    )
+    zip_bytes = create_results_csv_zip_bytes({"SheetA": dataframe}, ["SheetA"])
+
+    with zipfile.ZipFile(BytesIO(zip_bytes)) as archive:
+        assert archive.namelist() == ["SheetA.csv"]
+        loaded = pd.read_csv(BytesIO(archive.read("SheetA.csv")))
+
+    assert len(loaded) == 1
+    assert loaded.iloc[0]["NCT Number"] == "NCT001"
+
+
 def test_get_trials_returns_filtered_trial_and_reports_progress(monkeypatch):
     input_frame = pd.DataFrame(
         [
@@ -68,10 +88,10 @@ def test_get_trials_returns_filtered_trial_and_reports_progress(monkeypatch):
             }
 
     def mock_get(_url, timeout):
-        assert timeout == 30
+        assert timeout == (5, 30)
         return MockResponse()
 
-    monkeypatch.setattr("logic.data_processing.requests.get", mock_get)
+    monkeypatch.setattr("logic.data_processing.SESSION.get", mock_get)
 
     results = get_trials(
         input_frame,
@@ -127,7 +147,7 @@ def test_get_trials_defaults_why_stopped_when_missing(monkeypatch):
                 ],
             }
 
-    monkeypatch.setattr("logic.data_processing.requests.get", lambda _url, timeout: MockResponse())
+    monkeypatch.setattr("logic.data_processing.SESSION.get", lambda _url, timeout: MockResponse())
 
     results = get_trials(input_frame, "bioTRAK Product ID")
 
@@ -136,6 +156,24 @@ def test_get_trials_defaults_why_stopped_when_missing(monkeypatch):
     assert results[0]["Why Stopped"] == "Not Available"
 
 
+def test_get_trials_stops_when_cancel_event_is_set():
+    input_frame = pd.DataFrame(
+        [
+            {
+                "bioTRAK Product ID": "A-1",
+                "Product Name": "Drug A",
+                "Original Phase": "Phase 1",
+            }
+        ]
+    )
+    cancel_event = threading.Event()
+    cancel_event.set()
+
+    results = get_trials(input_frame, "bioTRAK Product ID", cancel_event=cancel_event)
+
+    assert results == []
+
+
 def test_create_results_workbook_bytes_sets_nct_number_hyperlink():
     dataframe = pd.DataFrame(
         [
@@ -213,7 +251,7 @@ def test_get_trials_excludes_studies_older_than_eight_year_cutoff(monkeypatch):
                 ],
             }
 
-    monkeypatch.setattr("logic.data_processing.requests.get", lambda _url, timeout: MockResponse())
+    monkeypatch.setattr("logic.data_processing.SESSION.get", lambda _url, timeout: MockResponse())
 
     results = get_trials(
         input_frame,
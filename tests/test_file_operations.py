@@ -1,8 +1,15 @@
 from io import BytesIO
+from pathlib import Path
 
 import pandas as pd
+from openpyxl import Workbook
 
-from logic.file_operations import find_id_column, load_excel_file, validate_excel_content
+from logic.file_operations import (
+    _worksheet_to_dataframe,
+    find_id_column,
+    load_excel_file,
+    validate_excel_content,
+)
 
 
 def _build_workbook_bytes(sheet_mapping):
@@ -30,6 +37,29 @@ def test_load_excel_file_from_bytes():
     assert sheets["SheetA"].iloc[0]["Product Name"] == "Drug A"
 
 
+def test_load_excel_file_trims_phantom_trailing_rows():
+    # This fixture declares 597 rows but only 73 carry data; readers that
+    # trust the declared dimensions must not surface the empty tail.
+    fixture_path = Path(__file__).resolve().parents[1] / "excel files" / "Debug_file.xlsx"
+    sheets = load_excel_file(str(fixture_path))
+
+    assert len(sheets["Sheet1"]) == 73
+
+
+def test_worksheet_to_dataframe_normalizes_blank_and_duplicate_headers():
+    workbook = Workbook()
+    worksheet = workbook.active
+    worksheet.append(["Product Name", None, "Product Name"])
+    worksheet.append(["Drug A", "x", "Drug A again"])
+
+    frame = _worksheet_to_dataframe(worksheet)
+
+    assert list(frame.columns) == ["Product Name", "Unnamed: 1", "Product Name.1"]
+    # Blank headers must not crash the substring validation scan.
+    validation = validate_excel_content({"SheetA": frame}, ["Product Name", "Original Phase"])
+    assert validation["SheetA"][0] is False
+
+
 def test_validate_excel_content_with_missing_required_column():
     sheets = {
         "SheetA": pd.DataFrame(
@@ -39,8 +69,7 @@ def test_validate_excel_content_with_missing_required_column():
             }
         )
     }
-    required_map = {"SheetA": ["Product Name", "Original Phase"]}
-    validation = validate_excel_content(sheets, required_map)
+    validation = validate_excel_content(sheets, ["Product Name", "Original Phase"])
 
     assert validation["SheetA"][0] is False
     assert "Original Phase" in validation["SheetA"][1]